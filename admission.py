@@ -0,0 +1,218 @@
+"""
+Control de admisión para las llamadas a servicios externos (OpenAI, Open-Meteo, Google Calendar)
+
+Cada servicio tiene un límite de llamadas simultáneas y una cola de espera acotada.
+Si la cola está llena o se agota el tiempo de espera, se rechaza la petición
+rápidamente con Overloaded para que el servidor responda 503 + Retry-After.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+
+class Overloaded(Exception):
+    """El servicio externo está saturado y la petición se descarta"""
+
+    def __init__(self, upstream, retry_after, reason):
+        super().__init__(f"{upstream} saturado ({reason})")
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Lease:
+    """
+    Hueco concedido por un limitador, liberado al salir del bloque `with`
+
+    Si la llamada sigue en curso en otro hilo cuando la petición se abandona,
+    detach() traspasa la liberación a quien llame después a release().
+    """
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self._released = False
+        self._detached = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        """Devuelve el hueco al limitador (solo la primera vez)"""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter._release(self._acquired_at)
+
+    def detach(self):
+        """El bloque `with` ya no libera el hueco: lo hará una llamada posterior a release()"""
+        self._detached = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self._detached:
+            self.release()
+
+
+class UpstreamLimiter:
+    """
+    Semáforo con cola de espera acotada (FIFO) y métricas para un servicio externo
+
+    Al liberarse un hueco se entrega directamente al primero de la cola, de modo que
+    una petición recién llegada no puede adelantar a las que ya esperan.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, max_wait):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._granted = threading.Condition(self._lock)
+        self._available = max_concurrency
+        # Esperas en orden de llegada: [True] cuando se les ha entregado un hueco
+        self._queue = deque()
+
+        # Métricas
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.total_service = 0.0
+
+    def _retry_after(self):
+        """Estima en segundos cuándo habrá hueco, a partir del tiempo medio de servicio"""
+        avg_service = self.total_service / self.completed if self.completed else 1.0
+        pending = self.waiting + self.in_flight
+        return max(1, math.ceil(avg_service * pending / self.max_concurrency))
+
+    def _record_wait(self, waited):
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def slot(self, deadline=None):
+        """
+        Reserva un hueco para llamar al servicio externo
+
+        Args:
+            deadline: Instante límite (time.monotonic()) para conseguir el hueco (opcional,
+                      por defecto ahora + max_wait)
+
+        Returns:
+            Lease, para usar con `with`
+        """
+        start = time.monotonic()
+        wait_until = start + self.max_wait
+        if deadline is not None:
+            wait_until = min(wait_until, deadline)
+
+        with self._lock:
+            # Camino rápido: hay hueco libre y nadie esperando delante
+            if self._available > 0 and not self._queue:
+                self._available -= 1
+            else:
+                if self.waiting >= self.max_queue:
+                    self.shed += 1
+                    raise Overloaded(self.name, self._retry_after(), 'cola llena')
+                ticket = [False]
+                self._queue.append(ticket)
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+                while not ticket[0]:
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._granted.wait(remaining)
+                self.waiting -= 1
+                if not ticket[0]:
+                    self._queue.remove(ticket)
+                    self.timed_out += 1
+                    self._record_wait(time.monotonic() - start)
+                    raise Overloaded(self.name, self._retry_after(), 'tiempo de espera agotado')
+
+            lease = Lease(self)
+            self.in_flight += 1
+            self._record_wait(lease._acquired_at - start)
+        return lease
+
+    def _release(self, acquired_at):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_service += time.monotonic() - acquired_at
+            # El hueco pasa al primero de la cola; si no hay nadie, queda libre
+            if self._queue:
+                self._queue.popleft()[0] = True
+                self._granted.notify_all()
+            else:
+                self._available += 1
+
+    def stats(self):
+        """Devuelve las métricas actuales del limitador"""
+        with self._lock:
+            admitted = self.completed + self.in_flight
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'completed': self.completed,
+                'shed': self.shed,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': round(1000 * self.total_wait / admitted, 1) if admitted else 0.0,
+                'max_wait_ms': round(1000 * self.max_wait_seen, 1),
+            }
+
+
+def _limiter_from_env(name, prefix, max_concurrency, max_queue, max_wait, workers):
+    """
+    Crea un limitador leyendo la configuración de variables de entorno
+
+    Los límites configurados son globales: cada worker recibe su parte, de modo que
+    el total hacia el servicio no crece con el número de procesos (salvo que haya
+    más workers que hueco, ya que cada uno necesita al menos una llamada).
+    """
+    max_concurrency = int(os.getenv(f'{prefix}_MAX_CONCURRENCY', max_concurrency))
+    max_queue = int(os.getenv(f'{prefix}_MAX_QUEUE', max_queue))
+    return UpstreamLimiter(
+        name,
+        max_concurrency=max(1, max_concurrency // workers),
+        max_queue=max(1, max_queue // workers),
+        max_wait=float(os.getenv(f'{prefix}_MAX_WAIT', max_wait)),
+    )
+
+
+def _build_limiters(workers):
+    return {
+        'openai': _limiter_from_env('openai', 'OPENAI', 8, 16, 10.0, workers),
+        'open_meteo': _limiter_from_env('open_meteo', 'OPEN_METEO', 4, 16, 5.0, workers),
+        'google_calendar': _limiter_from_env('google_calendar', 'GOOGLE_CALENDAR', 4, 8, 5.0, workers),
+    }
+
+
+# Limitadores de este proceso (un solo proceso salvo que configure() diga otra cosa)
+limiters = _build_limiters(max(1, int(os.getenv('WEB_CONCURRENCY', 1))))
+
+
+def configure(workers):
+    """Reparte los límites globales entre `workers` procesos (llamar antes de servir peticiones)"""
+    limiters.update(_build_limiters(max(1, workers)))
+
+
+def slot(upstream, deadline=None):
+    """Atajo para reservar un hueco en el limitador de un servicio"""
+    return limiters[upstream].slot(deadline)
+
+
+def stats():
+    """Métricas de todos los limitadores"""
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de /api/chat contra servicios externos simulados
+
+Levanta un servidor stub que imita OpenAI (/v1/chat/completions, con o sin
+streaming y con llamadas a herramientas) y Open-Meteo (/v1/search y
+/v1/forecast), sustituye el servicio de Google Calendar por uno simulado y lanza
+una ráfaga de peticiones concurrentes contra server.py. Muestra cuántas se
+atendieron, cuántas se descartaron con 503 y las métricas de cola de los tres
+limitadores.
+
+Uso:
+    python benchmarks/load_test.py --requests 300 --concurrency 96 --mix chat,clima,calendario
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Mensaje de usuario de cada escenario y herramienta que provoca
+SCENARIOS = {
+    'chat': lambda i: 'Hola Jarvis',
+    'clima': lambda i: f'¿Qué tiempo hace en ciudad{i}?',
+    'calendario': lambda i: '¿Qué tengo hoy?',
+}
+
+
+def _tool_arguments(name, messages):
+    """Argumentos que el stub devuelve para la herramienta forzada"""
+    user_message = next(m['content'] for m in messages if m.get('role') == 'user')
+    if name == 'obtener_clima':
+        match = re.search(r'en (\w+)\?', user_message)
+        return {'city': match.group(1) if match else 'Madrid'}
+    if name == 'ver_calendario':
+        return {'periodo': 'hoy'}
+    return {}
+
+
+def _chat_chunks(body):
+    """Deltas de la respuesta simulada: una llamada a herramienta o un texto"""
+    tool_choice = body.get('tool_choice')
+    already_called = any(m.get('role') == 'tool' for m in body['messages'])
+    if body.get('tools') and isinstance(tool_choice, dict) and not already_called:
+        name = tool_choice['function']['name']
+        arguments = json.dumps(_tool_arguments(name, body['messages']))
+        return [
+            {'role': 'assistant', 'tool_calls': [{
+                'index': 0, 'id': 'call_stub', 'type': 'function',
+                'function': {'name': name, 'arguments': arguments[:10]}
+            }]},
+            {'tool_calls': [{'index': 0, 'function': {'arguments': arguments[10:]}}]},
+        ], 'tool_calls'
+    return [{'role': 'assistant', 'content': 'A sus órdenes, '}, {'content': 'Jefe.'}], 'stop'
+
+
+def start_stub_upstreams(openai_latency, meteo_latency=0.1):
+    """Servidor HTTP que responde como OpenAI y Open-Meteo tras la latencia indicada"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            time.sleep(meteo_latency)
+            if url.path == '/v1/search':
+                name = query['name'][0]
+                seed = int(hashlib.sha256(name.encode()).hexdigest()[:8], 16)
+                self._send_json({'results': [{
+                    'name': name, 'country': 'España',
+                    'latitude': 36 + seed % 700 / 100, 'longitude': -9 + seed % 1200 / 100
+                }]})
+            elif url.path == '/v1/forecast':
+                self._send_json({'current': {
+                    'temperature_2m': 21.5, 'relative_humidity_2m': 40, 'apparent_temperature': 21.0,
+                    'precipitation': 0.0, 'weather_code': 1, 'wind_speed_10m': 8.2
+                }})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            time.sleep(openai_latency)
+            deltas, finish_reason = _chat_chunks(body)
+            base = {'id': 'chatcmpl-stub', 'created': int(time.time()), 'model': 'gpt-4o-mini'}
+
+            if not body.get('stream'):
+                message = {'role': 'assistant', 'content': ''.join(d.get('content', '') for d in deltas)}
+                if finish_reason == 'tool_calls':
+                    call = deltas[0]['tool_calls'][0]
+                    message = {'role': 'assistant', 'content': None, 'tool_calls': [{
+                        'id': call['id'], 'type': 'function',
+                        'function': {'name': call['function']['name'],
+                                     'arguments': call['function']['arguments'] + deltas[1]['tool_calls'][0]['function']['arguments']}
+                    }]}
+                self._send_json(dict(base, object='chat.completion', choices=[
+                    {'index': 0, 'finish_reason': finish_reason, 'message': message}
+                ]))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for i, delta in enumerate(deltas):
+                chunk = dict(base, object='chat.completion.chunk', choices=[{
+                    'index': 0, 'delta': delta,
+                    'finish_reason': finish_reason if i == len(deltas) - 1 else None
+                }])
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Las ráfagas abren muchas conexiones a la vez
+        request_queue_size = 256
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StubCalendarService:
+    """Servicio de Google Calendar simulado con latencia fija"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def events(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+    def execute(self):
+        time.sleep(self.latency)
+        return {'items': [{'summary': 'Reunión', 'start': {'dateTime': '2025-12-06T10:00:00+01:00'}}]}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=96)
+    parser.add_argument('--latency', type=float, default=0.5, help='latencia simulada de OpenAI (s)')
+    parser.add_argument('--meteo-latency', type=float, default=0.3, help='latencia simulada de Open-Meteo (s)')
+    parser.add_argument('--calendar-latency', type=float, default=0.3, help='latencia simulada de Google Calendar (s)')
+    parser.add_argument('--mix', default='chat,clima,calendario',
+                        help=f'escenarios separados por comas, en rotación ({", ".join(SCENARIOS)})')
+    args = parser.parse_args()
+    mix = args.mix.split(',')
+
+    stub = start_stub_upstreams(args.latency, args.meteo_latency)
+    stub_url = f'http://127.0.0.1:{stub.server_port}/v1'
+    os.environ['OPENAI_BASE_URL'] = stub_url
+    os.environ['GEOCODING_API_URL'] = f'{stub_url}/search'
+    os.environ['WEATHER_API_URL'] = f'{stub_url}/forecast'
+    os.environ.setdefault('OPENAI_API_KEY', 'stub')
+    # OpenAI con más margen que los demás para que la presión llegue también a los
+    # limitadores de Open-Meteo y Google Calendar (ajustable con las mismas variables)
+    os.environ.setdefault('OPENAI_MAX_CONCURRENCY', '32')
+    os.environ.setdefault('OPENAI_MAX_QUEUE', '32')
+    # Sin caché de calendario y con una caché vacía para que cada petición llegue a los stubs
+    os.environ['CALENDAR_CACHE_TTL'] = '0'
+    os.environ['CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+
+    import requests
+    from werkzeug.serving import make_server
+    import google_calendar
+    import server as jarvis
+
+    google_calendar.get_calendar_service = lambda timeout=None: StubCalendarService(args.calendar_latency)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    http = make_server('127.0.0.1', 0, jarvis.app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{http.server_port}'
+
+    def one_request(i):
+        scenario = mix[i % len(mix)]
+        start = time.monotonic()
+        response = requests.post(f'{url}/api/chat', json={'message': SCENARIOS[scenario](i)})
+        return scenario, response.status_code, time.monotonic() - start, response.headers.get('Retry-After')
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one_request, range(args.requests)))
+    elapsed = time.monotonic() - start
+
+    ok = [latency for _, status, latency, _ in results if status == 200]
+    shed = [latency for _, status, latency, _ in results if status == 503]
+    missing_retry_after = sum(1 for _, status, _, retry in results if status == 503 and not retry)
+
+    print(f'Peticiones: {len(results)} en {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)')
+    print(f'  200: {len(ok)}  p50={percentile(ok, 50) * 1000:.0f}ms  p99={percentile(ok, 99) * 1000:.0f}ms')
+    print(f'  503: {len(shed)}  p50={percentile(shed, 50) * 1000:.0f}ms  p99={percentile(shed, 99) * 1000:.0f}ms')
+    print(f'  otros: {len(results) - len(ok) - len(shed)}  503 sin Retry-After: {missing_retry_after}')
+    for scenario in mix:
+        statuses = Counter(status for name, status, _, _ in results if name == scenario)
+        print(f'  {scenario:<12} ' + '  '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
+
+    print('Métricas por servicio:')
+    metrics = requests.get(f'{url}/api/metrics').json()
+    for name, stats in metrics.items():
+        print(f"  {name:<16} completadas={stats['completed']:<4} descartadas={stats['shed']:<4} "
+              f"timeouts={stats['timed_out']:<4} cola máx={stats['max_queue_depth']:<3} espera media={stats['avg_wait_ms']}ms máx={stats['max_wait_ms']}ms")
+
+    http.shutdown()
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque de server.py y calendar_mcp_server.py
+
+Mide, en procesos nuevos:
+  - el tiempo de importación de cada módulo y sus dependencias más lentas
+    (a partir del informe de `python -X importtime`)
+  - el tiempo hasta que server.py responde su primera petición HTTP
+  - el tiempo hasta que el servidor MCP responde a list_tools por stdio
+
+Uso:
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_report(module, top):
+    """Ejecuta `python -X importtime -c 'import <module>'` y devuelve (total, más lentos)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, WARMUP='0')
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        rows.append((int(cumulative_us), name.rstrip()))
+    # El informe está en postorden: las dependencias del módulo son el bloque de filas
+    # con sangría justo encima de la suya (lo anterior son imports de site, .pth, etc.)
+    position = next(i for i, (_, name) in enumerate(rows) if name.strip() == module and not name.startswith('  '))
+    total = rows[position][0]
+    first = position
+    while first > 0 and rows[first - 1][1].startswith('  '):
+        first -= 1
+    # Solo dependencias de primer nivel (sangría mínima)
+    top_level = [(us, name.strip()) for us, name in rows[first:position]
+                 if name.startswith('   ') and not name.startswith('    ')]
+    return total, sorted(top_level, reverse=True)[:top]
+
+
+def time_to_first_http_response(port):
+    env = dict(os.environ, PORT=str(port), OPENAI_API_KEY='stub')
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', 'import server; server.app.run(port=server.PORT)'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/api/metrics', timeout=1).read()
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def time_to_list_tools():
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'calendar_mcp_server.py'],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        messages = [
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {
+                'protocolVersion': '2025-06-18',
+                'capabilities': {},
+                'clientInfo': {'name': 'startup-benchmark', 'version': '1.0'}
+            }},
+            {'jsonrpc': '2.0', 'method': 'notifications/initialized'},
+            {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'},
+        ]
+        for message in messages:
+            process.stdin.write(json.dumps(message) + '\n')
+        process.stdin.flush()
+        for line in process.stdout:
+            if json.loads(line).get('id') == 2:
+                return time.perf_counter() - start
+        raise RuntimeError('El servidor MCP terminó sin responder a tools/list')
+    finally:
+        process.kill()
+        process.wait()
+
+
+def summary(samples):
+    return f'mediana={statistics.median(samples) * 1000:7.1f}ms  min={min(samples) * 1000:7.1f}ms'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5056)
+    args = parser.parse_args()
+
+    for module in ('server', 'calendar_mcp_server', 'google_calendar'):
+        total, slowest = import_report(module, args.top)
+        print(f'import {module}: {total / 1000:.1f} ms')
+        for us, name in slowest:
+            print(f'    {us / 1000:8.1f} ms  {name}')
+
+    print()
+    print(f'server.py primera respuesta HTTP:  {summary([time_to_first_http_response(args.port) for _ in range(args.runs)])}')
+    print(f'MCP primera respuesta list_tools: {summary([time_to_list_tools() for _ in range(args.runs)])}')
+
+
+if __name__ == '__main__':
+    main()
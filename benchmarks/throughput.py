@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Comparativa de throughput: servidor de desarrollo vs Gunicorn multi-worker
+
+Arranca server.py de las dos formas contra un OpenAI simulado y lanza la misma
+carga (/api/chat y la página principal) contra cada uno.
+
+Uso:
+    python benchmarks/throughput.py --requests 2000 --concurrency 64
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from load_test import percentile, start_stub_upstreams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'{url}/api/metrics', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'El servidor no arrancó en {url}')
+
+
+def run_load(url, total, concurrency):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def one_request(i):
+        start = time.monotonic()
+        if i % 2:
+            response = session.post(f'{url}/api/chat', json={'message': 'Hola Jarvis'})
+        else:
+            response = session.get(f'{url}/')
+        return response.status_code, time.monotonic() - start
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    elapsed = time.monotonic() - start
+
+    latencies = [latency for status, latency in results if status == 200]
+    errors = sum(1 for status, _ in results if status != 200)
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+def benchmark(name, command, env, port, args):
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_ready(url)
+        run_load(url, min(200, args.requests), args.concurrency)  # calentamiento
+        rps, p50, p99, errors = run_load(url, args.requests, args.concurrency)
+        print(f'{name:<28} {rps:8.1f} req/s   p50={p50 * 1000:6.1f}ms   p99={p99 * 1000:6.1f}ms   errores={errors}')
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.05, help='latencia simulada de OpenAI (s)')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    stub = start_stub_upstreams(args.latency)
+    env = dict(
+        os.environ,
+        PORT=str(args.port),
+        OPENAI_BASE_URL=f'http://127.0.0.1:{stub.server_port}/v1',
+        OPENAI_API_KEY='stub',
+        # Medir la capacidad del servidor, no el control de admisión
+        OPENAI_MAX_CONCURRENCY='1000',
+        OPENAI_MAX_QUEUE='1000',
+    )
+
+    benchmark('python server.py (dev)', [sys.executable, 'server.py'], env, args.port, args)
+    benchmark('gunicorn -c gunicorn.conf.py', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'server:app'],
+              env, args.port, args)
+
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
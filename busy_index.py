@@ -0,0 +1,89 @@
+"""
+Índice de intervalos ocupados del calendario
+
+Guarda los intervalos ocupados (de la API freebusy) fusionados y ordenados, de modo
+que "¿está libre este hueco?" y "¿cuál es el próximo hueco libre de N minutos?" se
+responden en O(log n) con bisect y una tabla dispersa de máximos sobre los huecos
+entre intervalos.
+"""
+from bisect import bisect_right
+
+
+class BusyIndex:
+    """Intervalos ocupados [inicio, fin) ordenados y sin solapamientos"""
+
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals: Iterable de tuplas (inicio, fin) comparables entre sí
+                       (datetimes con zona horaria o números)
+        """
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+        # gaps[i] = hueco libre entre el intervalo i y el i+1
+        gaps = [self.starts[i + 1] - self.ends[i] for i in range(len(merged) - 1)]
+        # Tabla dispersa: _max_gap[k][i] = máximo de gaps[i:i + 2**k]
+        self._max_gap = [gaps]
+        k = 1
+        while (1 << k) <= len(gaps):
+            previous = self._max_gap[-1]
+            half = 1 << (k - 1)
+            self._max_gap.append([
+                max(previous[i], previous[i + half]) for i in range(len(gaps) - (1 << k) + 1)
+            ])
+            k += 1
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _range_max_gap(self, lo, hi):
+        """Máximo de gaps[lo..hi] (ambos incluidos) en O(1)"""
+        k = (hi - lo + 1).bit_length() - 1
+        return max(self._max_gap[k][lo], self._max_gap[k][hi - (1 << k) + 1])
+
+    def _first_gap_at_least(self, lo, duration):
+        """Índice del primer intervalo j >= lo tras el cual hay un hueco >= duration"""
+        last = len(self.starts) - 1
+        if lo >= last or self._range_max_gap(lo, last - 1) < duration:
+            # Solo queda el tiempo libre tras el último intervalo
+            return last
+        hi = last - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._range_max_gap(lo, mid) >= duration:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def busy_at(self, moment):
+        """Devuelve el intervalo (inicio, fin) que contiene `moment`, o None"""
+        i = bisect_right(self.starts, moment) - 1
+        if i >= 0 and self.ends[i] > moment:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def is_free(self, start, end):
+        """Indica si [start, end) no se solapa con ningún intervalo ocupado"""
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] > start:
+            return False
+        return i + 1 >= len(self.starts) or self.starts[i + 1] >= end
+
+    def next_free_slot(self, after, duration):
+        """Inicio del primer hueco libre de longitud `duration` que empieza en `after` o después"""
+        i = bisect_right(self.starts, after) - 1
+        candidate = after
+        if i >= 0 and self.ends[i] > after:
+            candidate = self.ends[i]
+        if i + 1 >= len(self.starts) or self.starts[i + 1] - candidate >= duration:
+            return candidate
+        return self.ends[self._first_gap_at_least(i + 1, duration)]
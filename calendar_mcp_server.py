@@ -6,6 +6,7 @@ Proporciona acceso al calendario mediante Model Context Protocol
 
 import asyncio
 import json
+import os
 from datetime import datetime, timedelta
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -64,10 +65,34 @@ async def list_tools() -> list[Tool]:
                     "ubicacion": {
                         "type": "string",
                         "description": "Ubicación del evento (opcional)"
+                    },
+                    "permitir_solapamiento": {
+                        "type": "boolean",
+                        "description": "Crear el evento aunque se solape con otro. Solo true si el usuario pide expresamente crearlo aunque esté ocupado (por defecto false)",
+                        "default": False
                     }
                 },
                 "required": ["titulo", "fecha_inicio"]
             }
+        ),
+        Tool(
+            name="consultar_disponibilidad",
+            description="Comprueba si un hueco del calendario está libre y, si no, devuelve el próximo hueco libre de esa duración.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "fecha_inicio": {
+                        "type": "string",
+                        "description": "Fecha y hora de inicio del hueco en formato ISO 8601 (ej: '2025-12-06T10:00:00')"
+                    },
+                    "duracion_minutos": {
+                        "type": "integer",
+                        "description": "Duración del hueco en minutos (por defecto 60)",
+                        "default": 60
+                    }
+                },
+                "required": ["fecha_inicio"]
+            }
         )
     ]
 
@@ -92,23 +117,36 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         fecha_fin = arguments.get("fecha_fin")
         descripcion = arguments.get("descripcion")
         ubicacion = arguments.get("ubicacion")
+        permitir_solapamiento = arguments.get("permitir_solapamiento", False)
         
         result = google_calendar.create_event(
             summary=titulo,
             start_datetime=fecha_inicio,
             end_datetime=fecha_fin,
             description=descripcion,
-            location=ubicacion
+            location=ubicacion,
+            allow_conflicts=permitir_solapamiento
         )
         
         return [TextContent(type="text", text=result)]
     
+    elif name == "consultar_disponibilidad":
+        fecha_inicio = arguments["fecha_inicio"]
+        duracion_minutos = arguments.get("duracion_minutos", 60)
+        
+        result = google_calendar.check_availability(fecha_inicio, duracion_minutos)
+        
+        return [TextContent(type="text", text=result)]
+    
     else:
         raise ValueError(f"Herramienta desconocida: {name}")
 
 async def main():
     """Ejecutar el servidor MCP"""
     async with stdio_server() as (read_stream, write_stream):
+        # Precargar las librerías de Google sin retrasar la respuesta a list_tools
+        if os.getenv("WARMUP", "1") != "0":
+            asyncio.get_running_loop().run_in_executor(None, google_calendar.warm_up)
         await app.run(read_stream, write_stream, app.create_initialization_options())
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+"""
+Plazos (deadlines) y cancelación de peticiones
+
+Cada petición HTTP recibe un plazo que se propaga a las llamadas a OpenAI,
+Open-Meteo y Google Calendar. Si el plazo vence o el cliente se desconecta,
+el trabajo pendiente se aborta para liberar capacidad.
+"""
+import os
+import select
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Plazo por defecto y máximo (en segundos) de una petición
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 30))
+
+# Cada cuánto se comprueba la conexión del cliente mientras se espera una llamada externa
+POLL_INTERVAL = 0.1
+
+# Hilos que ejecutan las llamadas bloqueantes vigiladas con call()
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPSTREAM_THREADS', 32)), thread_name_prefix='upstream')
+
+
+class Cancelled(Exception):
+    """La petición se abandonó porque el cliente se desconectó"""
+
+
+class DeadlineExceeded(Cancelled):
+    """El plazo de la petición ha vencido"""
+
+
+class RequestDeadline:
+    """Plazo de una petición junto con la conexión del cliente que la originó"""
+
+    def __init__(self, timeout, client_socket=None):
+        self.expires_at = time.monotonic() + timeout
+        self._socket = client_socket
+        self._client_gone = False
+
+    def remaining(self):
+        """Segundos que quedan hasta el vencimiento del plazo"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def client_disconnected(self):
+        """Comprueba sin bloquear si el cliente ha cerrado la conexión"""
+        if self._client_gone or self._socket is None:
+            return self._client_gone
+        try:
+            readable, _, _ = select.select([self._socket], [], [], 0)
+            if readable and not self._socket.recv(1, socket.MSG_PEEK):
+                self._client_gone = True
+        except ValueError:
+            # Sockets TLS no admiten MSG_PEEK: dejar de vigilar la conexión
+            self._socket = None
+        except OSError:
+            self._client_gone = True
+        return self._client_gone
+
+    def check(self):
+        """Lanza Cancelled/DeadlineExceeded si no merece la pena seguir trabajando"""
+        if self.client_disconnected():
+            raise Cancelled('El cliente se desconectó')
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded('Plazo de la petición vencido')
+
+    def timeout(self):
+        """Timeout para la próxima llamada externa (comprueba antes el plazo)"""
+        self.check()
+        return self.remaining()
+
+
+def _discard(lease, future):
+    """Cierra el resultado de una llamada abandonada y libera su hueco de admisión"""
+    try:
+        if future.exception() is None:
+            close = getattr(future.result(), 'close', None)
+            if close is not None:
+                close()
+    finally:
+        if lease is not None:
+            lease.release()
+
+
+def call(deadline, fn, *args, lease=None, **kwargs):
+    """
+    Ejecuta una llamada bloqueante en otro hilo mientras se vigila el plazo y el cliente
+
+    Si el cliente se desconecta o vence el plazo durante la espera, lanza Cancelled o
+    DeadlineExceeded en el acto y libera el hilo de la petición. La llamada abandonada
+    no puede interrumpirse: cuando termine se cierra su resultado (p. ej. un stream)
+    y se libera `lease`, su hueco de admisión.
+
+    Args:
+        deadline: RequestDeadline de la petición
+        fn: Función bloqueante a ejecutar con *args y **kwargs
+        lease: Hueco de admission.slot() que ocupa la llamada (opcional)
+    """
+    future = _executor.submit(fn, *args, **kwargs)
+    while True:
+        try:
+            return future.result(timeout=POLL_INTERVAL)
+        except FutureTimeoutError:
+            try:
+                deadline.check()
+            except Cancelled:
+                if lease is not None:
+                    lease.detach()
+                future.add_done_callback(lambda f: _discard(lease, f))
+                raise
+
+
+def from_request(request):
+    """
+    Crea el plazo de una petición de Flask
+
+    El cliente puede acortar el plazo con la cabecera X-Request-Timeout (segundos),
+    pero nunca ampliarlo por encima de REQUEST_TIMEOUT.
+    """
+    timeout = REQUEST_TIMEOUT
+    try:
+        timeout = min(timeout, float(request.headers.get('X-Request-Timeout', timeout)))
+    except ValueError:
+        pass
+    client_socket = request.environ.get('werkzeug.socket') or request.environ.get('gunicorn.socket')
+    return RequestDeadline(timeout, client_socket)
@@ -3,77 +3,232 @@ Módulo para autenticación y acceso a Google Calendar API
 """
 import os
 import pickle
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import admission
+import shared_cache
+from admission import Overloaded
+from busy_index import BusyIndex
+from deadlines import Cancelled
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
 
 # Scopes necesarios para Google Calendar (lectura y escritura)
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-def get_calendar_service():
-    """Obtiene el servicio de Google Calendar autenticado"""
-    creds = None
+# Tiempo de vida de los eventos en la caché compartida (segundos)
+EVENTS_CACHE_TTL = int(os.getenv('CALENDAR_CACHE_TTL', 60))
+
+# Zona horaria de los eventos y días consultados en cada petición a freebusy
+TIMEZONE = 'Europe/Madrid'
+LOCAL_TZ = ZoneInfo(TIMEZONE)
+FREEBUSY_WINDOW_DAYS = 7
+
+# Índices ya construidos en este proceso, por (día de inicio de la ventana, generación)
+_busy_indexes = {}
+_busy_indexes_lock = threading.Lock()
+MAX_BUSY_INDEXES = 16
+
+def warm_up():
+    """Importa por adelantado las librerías de Google (se cargan bajo demanda)"""
+    import google.auth.transport.requests
+    import google_auth_oauthlib.flow
+    import googleapiclient.discovery
+    import google_auth_httplib2
+
+class AuthenticationInProgress(RuntimeError):
+    """Otro proceso está esperando a que el usuario se autentique en el navegador"""
+
+@contextmanager
+def _token_lock(token_path):
+    """Bloqueo exclusivo entre procesos para leer/refrescar el token"""
+    if fcntl is None:
+        yield
+        return
+    with open(token_path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@contextmanager
+def _auth_lock(token_path):
+    """
+    Bloqueo entre procesos para la autenticación interactiva, sin esperar
+
+    La autenticación en el navegador puede tardar minutos: si otro proceso ya la
+    está haciendo se lanza AuthenticationInProgress en vez de bloquear la petición.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(token_path + '.auth.lock', 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise AuthenticationInProgress(
+                'Google Calendar necesita autenticación y ya se está completando en otro proceso; '
+                'termina el inicio de sesión en el navegador y vuelve a intentarlo'
+            ) from None
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@contextmanager
+def _api_call(deadline):
+    """
+    Hueco de admisión para llamar a la API de Google Calendar
+
+    Solo se reserva cuando hay que llamar a la API (no en los aciertos de caché).
+    Devuelve el timeout de la llamada según el plazo de la petición, o None sin plazo.
+    """
+    if deadline is None:
+        yield None
+        return
+    with admission.slot('google_calendar', deadline.expires_at):
+        yield deadline.timeout()
+
+def _save_token(creds, token_path):
+    """Escribe el token de forma atómica (fichero temporal + rename)"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(token_path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as token:
+            pickle.dump(creds, token)
+        os.replace(temp_path, token_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def get_calendar_service(timeout=None):
+    """
+    Obtiene el servicio de Google Calendar autenticado
+    
+    Args:
+        timeout: Timeout en segundos de las llamadas HTTP a la API (opcional)
+    """
+    # Las librerías de Google tardan en importarse: se cargan en el primer uso
+    from googleapiclient.discovery import build
+    from google_auth_httplib2 import AuthorizedHttp
+    import httplib2
+    
     token_path = 'token.pickle'
     
+    # Varios workers pueden refrescar el token a la vez: solo uno lo hace y los
+    # demás leen el token ya renovado al obtener el bloqueo
+    with _token_lock(token_path):
+        creds = _load_or_refresh_credentials(token_path)
+    
+    # La autenticación interactiva se hace fuera de ese bloqueo para no dejar
+    # esperando a los demás workers mientras el usuario usa el navegador
+    if creds is None:
+        creds = _authenticate(token_path)
+    
+    if timeout is not None:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+        return build('calendar', 'v3', http=http)
+    return build('calendar', 'v3', credentials=creds)
+
+def _load_or_refresh_credentials(token_path):
+    """
+    Carga el token guardado y lo renueva si ha caducado
+
+    Returns:
+        Credenciales válidas, o None si hace falta autenticación interactiva
+    """
+    from google.auth.transport.requests import Request
+    
+    creds = None
+    
     # Cargar token guardado si existe
     if os.path.exists(token_path):
         with open(token_path, 'rb') as token:
             creds = pickle.load(token)
     
-    # Si no hay credenciales válidas, autenticar
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            print("\n🔐 Se requiere autenticación con Google Calendar")
-            print("📋 Configurando autenticación...\n")
-            
-            # Crear credenciales desde variables de entorno
-            client_config = {
-                "installed": {
-                    "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-                    "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-                    "redirect_uris": ["http://localhost:8080/"],
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                }
+    if creds and creds.valid:
+        return creds
+    if creds and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+        # Guardar credenciales para la próxima vez
+        _save_token(creds, token_path)
+        return creds
+    return None
+
+def _authenticate(token_path):
+    """Autentica al usuario en el navegador y guarda el token"""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    
+    with _auth_lock(token_path):
+        # Otro proceso puede haber terminado la autenticación mientras tanto
+        with _token_lock(token_path):
+            creds = _load_or_refresh_credentials(token_path)
+        if creds is not None:
+            return creds
+        
+        print("\n🔐 Se requiere autenticación con Google Calendar")
+        print("📋 Configurando autenticación...\n")
+        
+        # Crear credenciales desde variables de entorno
+        client_config = {
+            "installed": {
+                "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+                "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
+                "redirect_uris": ["http://localhost:8080/"],
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": "https://oauth2.googleapis.com/token",
             }
-            
-            flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
-            # Usar servidor local en puerto 8080
-            creds = flow.run_local_server(
-                host='localhost',
-                port=8080,
-                open_browser=True,
-                success_message='✅ Autenticación completada. Puedes cerrar esta ventana.'
-            )
-            print("✅ Autenticación completada exitosamente\n")
+        }
+        
+        flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
+        # Usar servidor local en puerto 8080
+        creds = flow.run_local_server(
+            host='localhost',
+            port=8080,
+            open_browser=True,
+            success_message='✅ Autenticación completada. Puedes cerrar esta ventana.'
+        )
+        print("✅ Autenticación completada exitosamente\n")
         
         # Guardar credenciales para la próxima vez
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
+        with _token_lock(token_path):
+            _save_token(creds, token_path)
     
-    return build('calendar', 'v3', credentials=creds)
+    return creds
 
-def get_upcoming_events(max_results=10):
-    """Obtiene los próximos eventos del calendario"""
+def get_upcoming_events(max_results=10, deadline=None):
+    """
+    Obtiene los próximos eventos del calendario
+    
+    Args:
+        max_results: Número máximo de eventos
+        deadline: RequestDeadline de la petición (opcional)
+    """
     try:
-        service = get_calendar_service()
-        
-        # Obtener eventos desde ahora
-        now = datetime.utcnow().isoformat() + 'Z'
-        
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=now,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+        events = shared_cache.get('calendar', f'upcoming:{max_results}')
+        if events is None:
+            # Obtener eventos desde ahora
+            now = datetime.utcnow().isoformat() + 'Z'
+            
+            with _api_call(deadline) as timeout:
+                service = get_calendar_service(timeout)
+                events_result = service.events().list(
+                    calendarId='primary',
+                    timeMin=now,
+                    maxResults=max_results,
+                    singleEvents=True,
+                    orderBy='startTime'
+                ).execute()
+            
+            events = events_result.get('items', [])
+            shared_cache.set('calendar', f'upcoming:{max_results}', events, EVENTS_CACHE_TTL)
         
         if not events:
             return "No tienes eventos próximos en tu calendario, Jefe."
@@ -99,29 +254,39 @@ def get_upcoming_events(max_results=10):
         
         return result
     
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         print(f"Error al obtener eventos del calendario: {e}")
         return f"Lo siento, Jefe. Hubo un error al acceder a su calendario: {str(e)}"
 
-def get_today_events():
-    """Obtiene los eventos de hoy"""
+def get_today_events(deadline=None):
+    """
+    Obtiene los eventos de hoy
+    
+    Args:
+        deadline: RequestDeadline de la petición (opcional)
+    """
     try:
-        service = get_calendar_service()
-        
         # Inicio y fin del día de hoy
         now = datetime.now()
         start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + 'Z'
         end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat() + 'Z'
         
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=start_of_day,
-            timeMax=end_of_day,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+        events = shared_cache.get('calendar', f'today:{now.date().isoformat()}')
+        if events is None:
+            with _api_call(deadline) as timeout:
+                service = get_calendar_service(timeout)
+                events_result = service.events().list(
+                    calendarId='primary',
+                    timeMin=start_of_day,
+                    timeMax=end_of_day,
+                    singleEvents=True,
+                    orderBy='startTime'
+                ).execute()
+            
+            events = events_result.get('items', [])
+            shared_cache.set('calendar', f'today:{now.date().isoformat()}', events, EVENTS_CACHE_TTL)
         
         if not events:
             return "No tienes eventos programados para hoy, Jefe."
@@ -144,11 +309,110 @@ def get_today_events():
         
         return result
     
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         print(f"Error al obtener eventos de hoy: {e}")
         return f"Lo siento, Jefe. Hubo un error al acceder a su calendario: {str(e)}"
 
-def create_event(summary, start_datetime, end_datetime=None, description=None, location=None):
+def _to_local(value):
+    """Convierte una fecha ISO 8601 o datetime a la zona horaria local (sin zona = hora local)"""
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=LOCAL_TZ)
+    return dt.astimezone(LOCAL_TZ)
+
+def _format_slot(start, end):
+    """Formatea un hueco como '06/12/2025 de 10:00 a 11:00'"""
+    if start.date() == end.date():
+        return f"{start.strftime('%d/%m/%Y')} de {start.strftime('%H:%M')} a {end.strftime('%H:%M')}"
+    return f"{start.strftime('%d/%m/%Y %H:%M')} a {end.strftime('%d/%m/%Y %H:%M')}"
+
+def get_busy_index(moment, deadline=None):
+    """
+    Obtiene el índice de intervalos ocupados de la ventana que contiene un instante
+    
+    La ventana empieza a las 00:00 del día de `moment` y dura FREEBUSY_WINDOW_DAYS días.
+    Se consulta una sola vez a la API freebusy y se guarda en la caché compartida
+    junto con una generación nueva. Cada proceso reutiliza el índice construido
+    mientras la generación no cambie, es decir, hasta que la entrada caduque o se
+    invalide el espacio de nombres 'calendar'.
+    
+    Args:
+        moment: datetime con zona horaria
+        deadline: RequestDeadline de la petición (opcional)
+    
+    Returns:
+        Tupla (BusyIndex, fin de la ventana)
+    """
+    window_start = moment.astimezone(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    window_end = window_start + timedelta(days=FREEBUSY_WINDOW_DAYS)
+    cache_key = f'freebusy:{window_start.date().isoformat()}'
+    
+    cached = shared_cache.get('calendar', cache_key)
+    if cached is None:
+        with _api_call(deadline) as timeout:
+            service = get_calendar_service(timeout)
+            freebusy_result = service.freebusy().query(body={
+                'timeMin': window_start.isoformat(),
+                'timeMax': window_end.isoformat(),
+                'timeZone': TIMEZONE,
+                'items': [{'id': 'primary'}]
+            }).execute()
+        
+        busy = [(b['start'], b['end']) for b in freebusy_result['calendars']['primary'].get('busy', [])]
+        cached = (uuid.uuid4().hex, busy)
+        shared_cache.set('calendar', cache_key, cached, EVENTS_CACHE_TTL)
+    
+    generation, busy = cached
+    memo_key = (window_start.date(), generation)
+    index = _busy_indexes.get(memo_key)
+    if index is None:
+        index = BusyIndex((_to_local(start), _to_local(end)) for start, end in busy)
+        with _busy_indexes_lock:
+            # Las generaciones anteriores ya no se usarán: descartar las más antiguas
+            while len(_busy_indexes) >= MAX_BUSY_INDEXES:
+                del _busy_indexes[next(iter(_busy_indexes))]
+            _busy_indexes[memo_key] = index
+    
+    return index, window_end
+
+def _next_free_slot_text(index, window_end, after, duration):
+    """Describe el próximo hueco libre de `duration` a partir de `after`"""
+    slot_start = index.next_free_slot(after, duration)
+    if slot_start + duration > window_end:
+        return f"No hay huecos libres de {int(duration.total_seconds() // 60)} minutos en los próximos {FREEBUSY_WINDOW_DAYS} días."
+    return f"🕐 Próximo hueco libre: {_format_slot(slot_start, slot_start + duration)}"
+
+def check_availability(start_datetime, duration_minutes=60, deadline=None):
+    """
+    Comprueba si un hueco está libre y, si no, busca el próximo hueco libre
+    
+    Args:
+        start_datetime: Fecha/hora de inicio (formato ISO 8601 o datetime)
+        duration_minutes: Duración del hueco en minutos (por defecto 60)
+        deadline: RequestDeadline de la petición (opcional)
+    """
+    try:
+        start = _to_local(start_datetime)
+        duration = timedelta(minutes=duration_minutes)
+        index, window_end = get_busy_index(start, deadline)
+        
+        if index.is_free(start, start + duration):
+            return f"✅ Tiene libre {_format_slot(start, start + duration)}, Jefe."
+        
+        result = f"⛔ Ese hueco está ocupado, Jefe ({_format_slot(start, start + duration)}).\n"
+        result += _next_free_slot_text(index, window_end, start, duration)
+        return result
+    
+    except (Overloaded, Cancelled):
+        raise
+    except Exception as e:
+        print(f"Error al consultar disponibilidad: {e}")
+        return f"Lo siento, Jefe. Hubo un error al consultar su disponibilidad: {str(e)}"
+
+def create_event(summary, start_datetime, end_datetime=None, description=None, location=None, deadline=None,
+                 allow_conflicts=False):
     """
     Crea un nuevo evento en el calendario
     
@@ -158,10 +422,10 @@ def create_event(summary, start_datetime, end_datetime=None, description=None, l
         end_datetime: Fecha/hora de fin (opcional, por defecto 1 hora después del inicio)
         description: Descripción del evento (opcional)
         location: Ubicación del evento (opcional)
+        deadline: RequestDeadline de la petición (opcional)
+        allow_conflicts: Crear el evento aunque se solape con otro (por defecto False)
     """
     try:
-        service = get_calendar_service()
-        
         # Convertir datetime a string si es necesario
         if isinstance(start_datetime, datetime):
             start_str = start_datetime.isoformat()
@@ -183,16 +447,26 @@ def create_event(summary, start_datetime, end_datetime=None, description=None, l
         else:
             end_str = end_datetime
         
+        # No crear eventos que se solapen con otros salvo que se pida expresamente
+        if not allow_conflicts:
+            start_local, end_local = _to_local(start_str), _to_local(end_str)
+            index, window_end = get_busy_index(start_local, deadline)
+            if not index.is_free(start_local, end_local):
+                result = f"⚠️ No he creado el evento, Jefe: {_format_slot(start_local, end_local)} se solapa con otro compromiso.\n"
+                result += _next_free_slot_text(index, window_end, start_local, end_local - start_local)
+                result += "\nSi quiere crearlo igualmente, pídamelo de nuevo con el título y la hora añadiendo \"aunque esté ocupado\"."
+                return result
+        
         # Crear el evento
         event = {
             'summary': summary,
             'start': {
                 'dateTime': start_str,
-                'timeZone': 'Europe/Madrid',
+                'timeZone': TIMEZONE,
             },
             'end': {
                 'dateTime': end_str,
-                'timeZone': 'Europe/Madrid',
+                'timeZone': TIMEZONE,
             }
         }
         
@@ -203,7 +477,12 @@ def create_event(summary, start_datetime, end_datetime=None, description=None, l
             event['location'] = location
         
         # Insertar el evento
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
+        with _api_call(deadline) as timeout:
+            service = get_calendar_service(timeout)
+            created_event = service.events().insert(calendarId='primary', body=event).execute()
+        
+        # Los listados en caché ya no incluyen el nuevo evento
+        shared_cache.invalidate('calendar')
         
         # Formatear respuesta
         event_link = created_event.get('htmlLink')
@@ -220,6 +499,8 @@ def create_event(summary, start_datetime, end_datetime=None, description=None, l
         
         return result
         
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         print(f"Error al crear evento: {e}")
         return f"Lo siento, Jefe. Hubo un error al crear el evento: {str(e)}"
@@ -0,0 +1,63 @@
+"""
+Configuración de Gunicorn para servir Jarvis en producción con varios procesos
+
+Uso:
+    gunicorn -c gunicorn.conf.py server:app
+
+La aplicación se carga una vez antes del fork (preload_app) y cada worker atiende
+varias peticiones en hilos, ya que casi todo el tiempo se espera a OpenAI, Open-Meteo
+o Google Calendar. La caché de geocodificación, clima, TTS y calendario se comparte
+entre workers mediante SQLite (shared_cache.py).
+
+Las librerías pesadas (openai, requests, Google) se importan en el proceso maestro
+para que los workers las hereden ya cargadas; cada worker crea después su propio
+cliente de OpenAI. WARMUP=0 deja ambas cosas para la primera petición.
+
+Los límites de concurrencia de admission.py (<SERVICIO>_MAX_CONCURRENCY y
+<SERVICIO>_MAX_QUEUE) son globales: post_fork los reparte entre los workers.
+"""
+import multiprocessing
+import os
+import time
+
+import deadlines
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# Un worker por núcleo, con hilos para solapar la espera de E/S
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+preload_app = True
+
+# Margen sobre el plazo de las peticiones antes de matar un worker bloqueado
+timeout = int(deadlines.REQUEST_TIMEOUT) + 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+
+
+def when_ready(server):
+    """Importa las dependencias pesadas en el maestro, con el puerto ya abierto y antes de crear los workers"""
+    if os.getenv('WARMUP', '1') == '0':
+        return
+    import server as jarvis
+    start = time.perf_counter()
+    jarvis.import_dependencies()
+    print(f'✓ Dependencias importadas en el maestro en {(time.perf_counter() - start) * 1000:.0f} ms')
+
+
+def post_fork(server, worker):
+    """Reparte los límites de admisión entre el número real de workers (incluido -w)"""
+    import admission
+    admission.configure(server.cfg.workers)
+
+
+def post_worker_init(worker):
+    """Crea el cliente de OpenAI del worker (sus conexiones no se comparten entre procesos)"""
+    if os.getenv('WARMUP', '1') == '0':
+        return
+    import server
+    server.get_openai_client()
@@ -3,6 +3,7 @@ let mediaRecorder;
 let audioChunks = [];
 let isRecording = false;
 let isProcessing = false;
+let processingController = null; // Para cancelar las peticiones en curso
 let recognition; // Para Web Speech API
 let recognitionActive = false; // Control de estado del reconocimiento
 let audioContext;
@@ -145,18 +146,33 @@ function addMessage(text, sender) {
     chatContainer.scrollTop = chatContainer.scrollHeight;
 }
 
-// Función para reproducir audio
-async function playAudio(audioBlob) {
+// Función para reproducir audio (se detiene si se aborta `signal`)
+async function playAudio(audioBlob, signal) {
     // Asegurar que el audio esté desbloqueado
     await unlockAudio();
     
     return new Promise((resolve, reject) => {
+        if (signal && signal.aborted) {
+            resolve();
+            return;
+        }
+        
         const audio = new Audio();
         const url = URL.createObjectURL(audioBlob);
         
         audio.src = url;
         audio.volume = 1.0; // Volumen al máximo
         
+        // Cancelado por una nueva activación: cortar la respuesta para que no se grabe
+        if (signal) {
+            signal.addEventListener('abort', () => {
+                audio.pause();
+                URL.revokeObjectURL(url);
+                console.log('Reproducción de audio cancelada');
+                resolve();
+            }, { once: true });
+        }
+        
         audio.onended = () => {
             URL.revokeObjectURL(url); // Liberar memoria
             console.log('Reproducción de audio finalizada');
@@ -196,6 +212,9 @@ async function playAudio(audioBlob) {
 
 // Función principal para procesar audio
 async function processAudio(audioBlob) {
+    const controller = new AbortController();
+    const { signal } = controller;
+    processingController = controller;
     isProcessing = true;
     orb.classList.remove('listening');
     orb.classList.remove('speaking');
@@ -210,7 +229,8 @@ async function processAudio(audioBlob) {
         
         const transcribeResponse = await fetch('/api/transcribe', {
             method: 'POST',
-            body: formData
+            body: formData,
+            signal
         });
         
         if (!transcribeResponse.ok) {
@@ -238,7 +258,8 @@ async function processAudio(audioBlob) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ message: transcription })
+            body: JSON.stringify({ message: transcription }),
+            signal
         });
         
         if (!chatResponse.ok) {
@@ -268,7 +289,8 @@ async function processAudio(audioBlob) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ text: responseText })
+            body: JSON.stringify({ text: responseText }),
+            signal
         });
         
         console.log('← Respuesta TTS recibida:', ttsResponse.status, ttsResponse.statusText);
@@ -288,25 +310,48 @@ async function processAudio(audioBlob) {
         orb.classList.add('speaking');
         
         try {
-            await playAudio(audioResponseBlob);
+            await playAudio(audioResponseBlob, signal);
             console.log('Audio reproducido completamente');
         } catch (audioError) {
             console.error('Error al reproducir:', audioError);
             showStatus('Error al reproducir audio', 'error');
         }
         
+        // Si se canceló, la nueva activación ya controla la interfaz
+        if (signal.aborted) {
+            return;
+        }
+        
         orb.classList.remove('speaking');
         
         showStatus('Di "Jarvis" cuando necesites algo', 'success');
         updateOrbText('Di "Jarvis" para comenzar');
         
     } catch (error) {
+        if (error.name === 'AbortError') {
+            // Cancelado por una nueva activación: el servidor abandona el trabajo
+            console.log('Petición anterior cancelada');
+            return;
+        }
         console.error('Error:', error);
         showStatus(`Error: ${error.message}`, 'error');
         updateOrbText('Di "Jarvis" para comenzar');
         orb.classList.remove('speaking');
     } finally {
+        if (processingController === controller) {
+            processingController = null;
+            isProcessing = false;
+        }
+    }
+}
+
+// Cancelar el procesamiento en curso (el servidor detecta la desconexión)
+function cancelProcessing() {
+    if (processingController) {
+        processingController.abort();
+        processingController = null;
         isProcessing = false;
+        orb.classList.remove('speaking');
     }
 }
 
@@ -408,18 +453,16 @@ function initVoiceActivation() {
                 isRecording = false;
             }
             
-            if (!isProcessing) {
-                playBeep();
-                showStatus('¡A sus órdenes!', 'success');
-                updateOrbText('¿Qué necesita, Jefe?');
-                
-                setTimeout(() => {
-                    startRecordingAuto();
-                }, 500);
-            } else {
-                console.log('Procesando respuesta anterior, espere un momento...');
-                showStatus('Un momento, Jefe...', 'processing');
-            }
+            // Cancelar la respuesta anterior si todavía se está generando
+            cancelProcessing();
+            
+            playBeep();
+            showStatus('¡A sus órdenes!', 'success');
+            updateOrbText('¿Qué necesita, Jefe?');
+            
+            setTimeout(() => {
+                startRecordingAuto();
+            }, 500);
         }
     };
     
@@ -611,6 +654,9 @@ orb.addEventListener('click', async () => {
         console.log('Reconocimiento ya está activo');
     }
     
+    // Pulsar de nuevo mientras se genera o reproduce una respuesta la cancela
+    cancelProcessing();
+
     // También permite grabación directa
     if (!isRecording && !isProcessing) {
         playBeep();
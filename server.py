@@ -1,15 +1,24 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
-import requests
 from urllib.parse import quote
 import json
+import re
 from pathlib import Path
-import tempfile
+import io
+import hashlib
+import socket
+import threading
+import time
 import google_calendar
+import shared_cache
+from static_assets import StaticAssets
+import admission
+from admission import Overloaded
+import deadlines
+from deadlines import Cancelled, DeadlineExceeded
 
 # Cargar variables de entorno
 load_dotenv()
@@ -19,50 +28,132 @@ CORS(app)
 
 # Configuración
 PORT = int(os.getenv('PORT', 5000))
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Configurar OpenAI
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Archivos de public/ en memoria, con huella y precomprimidos
+static_assets = StaticAssets(os.path.join(app.root_path, 'public'))
+
+# URLs de Open-Meteo (configurables para apuntar a un servidor de pruebas)
+GEOCODING_API_URL = os.getenv('GEOCODING_API_URL', 'https://geocoding-api.open-meteo.com/v1/search')
+WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.open-meteo.com/v1/forecast')
+
+# Tiempo de vida (segundos) de las entradas en la caché compartida entre workers
+GEOCODE_CACHE_TTL = 30 * 24 * 3600
+WEATHER_CACHE_TTL = 10 * 60
+TTS_CACHE_TTL = 7 * 24 * 3600
+
+# Solo se cachea el audio de frases cortas (las que se repiten), hasta un tamaño total
+TTS_CACHE_MAX_CHARS = 200
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Cliente de OpenAI, creado bajo demanda: importar `openai` tarda casi un segundo
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Obtiene el cliente de OpenAI, importándolo la primera vez que se usa"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                # Sin reintentos automáticos: cada llamada recibe como timeout el plazo
+                # restante de la petición y un reintento lo sobrepasaría
+                _openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0)
+    return _openai_client
+
+def import_dependencies():
+    """Importa las librerías pesadas sin crear clientes ni conexiones (seguro antes de un fork)"""
+    import requests
+    import openai
+    google_calendar.warm_up()
+
+# Precarga en segundo plano de las dependencias pesadas, para que la primera
+# petición no pague su importación
+def warm_up():
+    start = time.perf_counter()
+    import_dependencies()
+    get_openai_client()
+    print(f'✓ Dependencias precargadas en {(time.perf_counter() - start) * 1000:.0f} ms')
+
+def start_warm_up(wait_for_port=None):
+    """
+    Lanza warm_up() en un hilo (desactivable con WARMUP=0)
+    
+    Args:
+        wait_for_port: Si se indica, espera a que el servidor acepte conexiones en
+                       ese puerto antes de precargar (opcional)
+    """
+    if os.getenv('WARMUP', '1') == '0':
+        return
+    
+    def run():
+        if wait_for_port is not None:
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', wait_for_port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            warm_up()
+        except Exception as e:
+            print(f'Error en la precarga: {e}')
+    
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
 
 # Función para obtener coordenadas de una ciudad
-def get_city_coordinates(city):
+def get_city_coordinates(city, deadline):
+    cached = shared_cache.get('geocode', city.strip().lower())
+    if cached is not None:
+        return cached
+    import requests
     try:
-        geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={quote(city)}&count=1&language=es&format=json"
-        response = requests.get(geocode_url)
+        geocode_url = f"{GEOCODING_API_URL}?name={quote(city)}&count=1&language=es&format=json"
+        with admission.slot('open_meteo', deadline.expires_at):
+            response = requests.get(geocode_url, timeout=deadline.timeout())
         data = response.json()
         
         if data.get('results') and len(data['results']) > 0:
             result = data['results'][0]
-            return {
+            location = {
                 'name': result['name'],
                 'country': result['country'],
                 'latitude': result['latitude'],
                 'longitude': result['longitude']
             }
+            shared_cache.set('geocode', city.strip().lower(), location, GEOCODE_CACHE_TTL)
+            return location
         return None
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         print(f'Error en geocodificación: {e}')
         return None
 
 # Función para obtener el clima de una ciudad
-def get_weather(city):
+def get_weather(city, deadline):
+    import requests
     try:
         print(f'📍 Consultando clima para: {city}')
         
         # Obtener coordenadas
-        location = get_city_coordinates(city)
+        location = get_city_coordinates(city, deadline)
         if not location:
             return f'No se pudo encontrar la ciudad "{city}". Intenta con otra ciudad.'
         
         print(f'✓ Coordenadas encontradas: {location}')
         
         # Obtener datos del clima
-        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={location['latitude']}&longitude={location['longitude']}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m&timezone=auto"
-        weather_response = requests.get(weather_url)
-        weather_data = weather_response.json()
-        
-        current = weather_data['current']
+        weather_key = f"{location['latitude']:.2f},{location['longitude']:.2f}"
+        current = shared_cache.get('weather', weather_key)
+        if current is None:
+            weather_url = f"{WEATHER_API_URL}?latitude={location['latitude']}&longitude={location['longitude']}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m&timezone=auto"
+            with admission.slot('open_meteo', deadline.expires_at):
+                weather_response = requests.get(weather_url, timeout=deadline.timeout())
+            weather_data = weather_response.json()
+            
+            current = weather_data['current']
+            shared_cache.set('weather', weather_key, current, WEATHER_CACHE_TTL)
         
         # Interpretar el código del clima
         weather_codes = {
@@ -99,6 +190,8 @@ def get_weather(city):
         
         print('✓ Clima obtenido')
         return clima_info
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         print(f'Error al obtener clima: {e}')
         return f'Lo siento, no pude obtener el clima para "{city}".'
@@ -172,22 +265,111 @@ tools = [
                     'ubicacion': {
                         'type': 'string',
                         'description': 'Ubicación del evento (opcional)'
+                    },
+                    'permitir_solapamiento': {
+                        'type': 'boolean',
+                        'description': 'Crear el evento aunque se solape con otro. Solo true si el usuario pide expresamente crearlo aunque esté ocupado (por defecto false)',
+                        'default': False
                     }
                 },
                 'required': ['titulo', 'fecha_inicio']
             }
         }
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'consultar_disponibilidad',
+            'description': 'Comprueba si el usuario tiene libre un hueco del calendario y, si está ocupado, busca el próximo hueco libre de esa duración. Úsala cuando pregunten: "¿tengo libre mañana a las 10?", "¿estoy disponible el viernes por la tarde?", "búscame un hueco de media hora", etc.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'fecha_inicio': {
+                        'type': 'string',
+                        'description': 'Fecha y hora de inicio del hueco en formato ISO 8601 (ej: "2025-12-06T10:00:00"). Para buscar el próximo hueco libre, usa la fecha y hora desde la que buscar'
+                    },
+                    'duracion_minutos': {
+                        'type': 'integer',
+                        'description': 'Duración del hueco en minutos (por defecto 60)',
+                        'default': 60
+                    }
+                },
+                'required': ['fecha_inicio']
+            }
+        }
     }
 ]
 
+# Descartar peticiones cuando un servicio externo está saturado
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    print(f'⚠️  Petición descartada: {e}')
+    response = jsonify({'error': 'Servidor saturado, inténtalo de nuevo en unos segundos'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+# Abandonar el trabajo cuando vence el plazo o el cliente se desconecta
+@app.errorhandler(Cancelled)
+def handle_cancelled(e):
+    print(f'⏹️  Petición abortada: {e}')
+    if isinstance(e, DeadlineExceeded):
+        return jsonify({'error': 'La petición tardó demasiado'}), 504
+    # 499: el cliente cerró la conexión (nadie leerá esta respuesta)
+    return jsonify({'error': 'Petición cancelada por el cliente'}), 499
+
+# Plazo de cada petición, propagado a las llamadas externas
+@app.before_request
+def start_deadline():
+    g.deadline = deadlines.from_request(request)
+
+# Acumular una respuesta de chat en streaming (texto y llamadas a herramientas),
+# abortando si ya no hace falta
+def collect_stream(stream, deadline):
+    parts = []
+    tool_calls = {}
+    with stream:
+        for chunk in stream:
+            deadline.check()
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                parts.append(delta.content)
+            # Las llamadas a herramientas llegan troceadas, agrupadas por índice
+            for call_delta in delta.tool_calls or []:
+                call = tool_calls.setdefault(call_delta.index, {
+                    'id': None,
+                    'type': 'function',
+                    'function': {'name': '', 'arguments': ''}
+                })
+                if call_delta.id:
+                    call['id'] = call_delta.id
+                if call_delta.function and call_delta.function.name:
+                    call['function']['name'] += call_delta.function.name
+                if call_delta.function and call_delta.function.arguments:
+                    call['function']['arguments'] += call_delta.function.arguments
+    return ''.join(parts), [tool_calls[index] for index in sorted(tool_calls)]
+
+# Métricas de concurrencia (profundidad de cola y tiempos de espera)
+@app.route('/api/metrics')
+def metrics():
+    return jsonify(admission.stats())
+
 # Servir archivos estáticos
 @app.route('/')
 def index():
-    return send_from_directory('public', 'index.html')
+    return serve_static('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('public', path)
+    # En modo debug se recogen los cambios en public/ sin reiniciar
+    if app.debug:
+        static_assets.reload_if_changed()
+    response = static_assets.serve(path)
+    if response is None:
+        return send_from_directory('public', path)
+    return response
 
 # Endpoint para transcribir audio con Whisper
 @app.route('/api/transcribe', methods=['POST'])
@@ -200,29 +382,42 @@ def transcribe():
         
         print('Transcribiendo audio con Whisper...')
         
-        # Guardar temporalmente el archivo
-        temp_path = os.path.join(UPLOAD_FOLDER, secure_filename(audio_file.filename or 'audio.webm'))
-        audio_file.save(temp_path)
-        
-        # Transcribir con Whisper
-        with open(temp_path, 'rb') as f:
-            transcription = client.audio.transcriptions.create(
+        # El audio se envía desde memoria: la llamada puede seguir en otro hilo si
+        # la petición se abandona
+        filename = secure_filename(audio_file.filename or '') or 'audio.webm'
+        audio_bytes = audio_file.read()
+        
+        # Transcribir con Whisper (vigilando la conexión mientras se espera)
+        deadline = g.deadline
+        with admission.slot('openai', deadline.expires_at) as lease:
+            transcription = deadlines.call(
+                deadline,
+                get_openai_client().audio.transcriptions.create,
                 model='whisper-1',
-                file=f,
-                language='es'
+                file=(filename, audio_bytes),
+                language='es',
+                timeout=deadline.timeout(),
+                lease=lease
             )
         
         print(f'Transcripción: {transcription.text}')
         
-        # Eliminar archivo temporal
-        os.remove(temp_path)
-        
         return jsonify({'text': transcription.text})
     
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
+        # Un timeout por plazo vencido o desconexión se responde como cancelación
+        g.deadline.check()
         print(f'Error en transcripción: {e}')
         return jsonify({'error': 'Error al transcribir audio'}), 500
 
+# Buscar palabras clave como palabras completas (admite el plural en -s), para que
+# "pon" no aparezca dentro de "disponible"
+def contains_keyword(text, keywords):
+    pattern = r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')s?\b'
+    return re.search(pattern, text) is not None
+
 # Endpoint para obtener respuesta de GPT con función de clima
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -233,6 +428,8 @@ def chat():
         if not message:
             return jsonify({'error': 'No se recibió mensaje'}), 400
         
+        deadline = g.deadline
+        
         print('💬 Generando respuesta con GPT + Function Calling...')
         print(f'Mensaje del usuario: {message}')
         
@@ -248,16 +445,25 @@ def chat():
         create_event_keywords = ['crea', 'crear', 'creó', 'creo', 'agenda', 'agendar', 'agendó', 
                                 'programa', 'programar', 'programó', 'añade', 'añadir', 'añadió',
                                 'agrega', 'agregar', 'agregó', 'nueva reunión', 'nuevo evento',
-                                'nueva cita', 'pon', 'poner', 'apunta', 'apuntar']
+                                'nueva cita', 'pon', 'poner', 'apunta', 'apuntar', 'ponme',
+                                'apúntame', 'agéndame']
+        
+        # Palabras clave para consultar disponibilidad
+        availability_keywords = ['libre', 'hueco', 'disponible', 'disponibilidad', 'ocupado', 'ocupada']
         
         # Palabras clave para clima
         weather_keywords = ['clima', 'tiempo', 'temperatura', 'llueve', 'calor', 'frío', 'frio',
                            'pronóstico', 'pronostico', 'meteorológico']
         
-        # Determinar si debe forzar el uso de herramientas
-        force_create_event = any(keyword in message_lower for keyword in create_event_keywords)
-        force_calendar = any(keyword in message_lower for keyword in calendar_keywords) and not force_create_event
-        force_weather = any(keyword in message_lower for keyword in weather_keywords)
+        # Determinar si debe forzar el uso de herramientas. Si el mensaje pide crear y
+        # menciona la disponibilidad ("agéndalo aunque esté ocupado", "ponme la cita en
+        # el primer hueco libre"), no se fuerza ninguna y el modelo decide
+        wants_availability = contains_keyword(message_lower, availability_keywords)
+        wants_create_event = contains_keyword(message_lower, create_event_keywords)
+        force_availability = wants_availability and not wants_create_event
+        force_create_event = wants_create_event and not wants_availability
+        force_calendar = contains_keyword(message_lower, calendar_keywords) and not wants_create_event and not wants_availability
+        force_weather = contains_keyword(message_lower, weather_keywords)
         
         # Crear el contexto de mensajes
         from datetime import datetime
@@ -281,11 +487,15 @@ HERRAMIENTAS DISPONIBLES:
 - obtener_clima: Para consultar el clima de cualquier ciudad
 - ver_calendario: Para consultar el calendario de Google del usuario
 - crear_evento: Para crear nuevos eventos en el calendario de Google
+- consultar_disponibilidad: Para comprobar si un hueco está libre o buscar el próximo hueco libre
 
 REGLAS OBLIGATORIAS:
 - Si preguntan por clima/tiempo/temperatura → USA obtener_clima
 - Si preguntan por eventos/reuniones/agenda/calendario/citas/qué tiene → USA ver_calendario
 - Si piden crear/agendar/programar un evento/reunión/cita → USA crear_evento
+- Si preguntan si tienen libre/hueco/disponibilidad → USA consultar_disponibilidad
+- Si crear_evento avisa de un solapamiento, NO insistas: propón el hueco libre sugerido
+- Si piden crear un evento "aunque esté ocupado" o "aunque se solape" → USA crear_evento con permitir_solapamiento=true
 - NUNCA respondas sobre el calendario sin usar las herramientas
 - NUNCA digas que no tienes acceso o que vas a revisar - USA LAS HERRAMIENTAS DIRECTAMENTE
 - Para crear eventos, DEBES formatear las fechas en ISO 8601 (YYYY-MM-DDTHH:MM:SS)
@@ -302,7 +512,10 @@ Ejemplos de inicio: "Por supuesto, Jefe", "Enseguida, Patrón", "A sus órdenes,
         
         # Determinar tool_choice basado en detección
         tool_choice = 'auto'
-        if force_create_event:
+        if force_availability:
+            tool_choice = {'type': 'function', 'function': {'name': 'consultar_disponibilidad'}}
+            print('🎯 FORZANDO uso de consultar_disponibilidad (se detectaron palabras clave de disponibilidad)')
+        elif force_create_event:
             tool_choice = {'type': 'function', 'function': {'name': 'crear_evento'}}
             print('🎯 FORZANDO uso de crear_evento (se detectaron palabras clave de creación de evento)')
         elif force_calendar:
@@ -314,74 +527,104 @@ Ejemplos de inicio: "Por supuesto, Jefe", "Enseguida, Patrón", "A sus órdenes,
         
         print(f'Tool choice: {tool_choice}')
         
-        # Primera llamada a GPT con herramientas disponibles
-        response = client.chat.completions.create(
-            model='gpt-4o-mini',
-            messages=messages,
-            tools=tools,
-            tool_choice=tool_choice
-        )
-        
-        response_message = response.choices[0].message
+        # Primera llamada a GPT con herramientas disponibles, en streaming y vigilando
+        # la conexión del cliente hasta que llega la respuesta
+        with admission.slot('openai', deadline.expires_at) as lease:
+            response = deadlines.call(
+                deadline,
+                get_openai_client().chat.completions.create,
+                model='gpt-4o-mini',
+                messages=messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                stream=True,
+                timeout=deadline.timeout(),
+                lease=lease
+            )
+            reply, tool_calls = collect_stream(response, deadline)
         
         # Si GPT decide usar una herramienta
-        if response_message.tool_calls:
-            print(f'🔧 GPT solicita usar herramienta: {response_message.tool_calls[0].function.name}')
+        if tool_calls:
+            print(f"🔧 GPT solicita usar herramienta: {tool_calls[0]['function']['name']}")
             
             # Agregar la respuesta de GPT (con tool_calls) al historial
-            messages.append(response_message)
+            messages.append({'role': 'assistant', 'content': reply or None, 'tool_calls': tool_calls})
             
             # Ejecutar cada herramienta solicitada
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
+            for tool_call in tool_calls:
+                # No ejecutar más herramientas si el cliente ya no espera la respuesta
+                deadline.check()
+                
+                function_name = tool_call['function']['name']
+                function_args = json.loads(tool_call['function']['arguments'])
                 
                 print(f'Ejecutando función: {function_name} con argumentos: {function_args}')
                 
                 function_response = None
                 if function_name == 'obtener_clima':
-                    function_response = get_weather(function_args['city'])
+                    function_response = get_weather(function_args['city'], deadline)
                 elif function_name == 'ver_calendario':
+                    # google_calendar reserva el hueco de admisión solo si tiene que llamar a la API
                     periodo = function_args.get('periodo', 'proximos')
                     if periodo == 'hoy':
-                        function_response = google_calendar.get_today_events()
+                        function_response = google_calendar.get_today_events(deadline=deadline)
                     else:
                         max_results = function_args.get('max_results', 10)
-                        function_response = google_calendar.get_upcoming_events(max_results)
+                        function_response = google_calendar.get_upcoming_events(max_results, deadline=deadline)
                 elif function_name == 'crear_evento':
                     titulo = function_args['titulo']
                     fecha_inicio = function_args['fecha_inicio']
                     fecha_fin = function_args.get('fecha_fin')
                     descripcion = function_args.get('descripcion')
                     ubicacion = function_args.get('ubicacion')
+                    permitir_solapamiento = function_args.get('permitir_solapamiento', False)
                     function_response = google_calendar.create_event(
                         summary=titulo,
                         start_datetime=fecha_inicio,
                         end_datetime=fecha_fin,
                         description=descripcion,
-                        location=ubicacion
+                        location=ubicacion,
+                        deadline=deadline,
+                        allow_conflicts=permitir_solapamiento
+                    )
+                elif function_name == 'consultar_disponibilidad':
+                    fecha_inicio = function_args['fecha_inicio']
+                    duracion_minutos = function_args.get('duracion_minutos', 60)
+                    function_response = google_calendar.check_availability(
+                        fecha_inicio,
+                        duracion_minutos,
+                        deadline=deadline
                     )
                 
                 # Agregar el resultado de la herramienta al historial
                 messages.append({
-                    'tool_call_id': tool_call.id,
+                    'tool_call_id': tool_call['id'],
                     'role': 'tool',
                     'name': function_name,
                     'content': function_response
                 })
             
             # Segunda llamada a GPT con los resultados de las herramientas
-            second_response = client.chat.completions.create(
-                model='gpt-4o-mini',
-                messages=messages
-            )
-            
-            response_message = second_response.choices[0].message
-        
-        print(f'✓ Respuesta generada: {response_message.content}')
-        return jsonify({'response': response_message.content})
+            with admission.slot('openai', deadline.expires_at) as lease:
+                second_response = deadlines.call(
+                    deadline,
+                    get_openai_client().chat.completions.create,
+                    model='gpt-4o-mini',
+                    messages=messages,
+                    stream=True,
+                    timeout=deadline.timeout(),
+                    lease=lease
+                )
+                reply, _ = collect_stream(second_response, deadline)
+        
+        print(f'✓ Respuesta generada: {reply}')
+        return jsonify({'response': reply})
     
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
+        # Un timeout por plazo vencido o desconexión se responde como cancelación
+        g.deadline.check()
         print(f'Error en chat: {e}')
         return jsonify({'error': 'Error al generar respuesta'}), 500
 
@@ -399,42 +642,54 @@ def speak():
         preview_text = text[:100] + ('...' if len(text) > 100 else '')
         print(f'Texto a convertir: {preview_text}')
         
-        # Generar audio con TTS
-        response = client.audio.speech.create(
-            model='tts-1',
-            voice='nova',
-            input=text,
-            speed=1.0
-        )
-        
-        # Crear archivo temporal para el audio
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_file.write(response.content)
-        temp_file.close()
-        
-        print(f'Audio generado, tamaño: {len(response.content)} bytes')
+        deadline = g.deadline
+        
+        # Las frases cortas repetidas ("A sus órdenes, Jefe") se sirven desde la caché
+        cacheable = len(text) <= TTS_CACHE_MAX_CHARS
+        tts_key = hashlib.sha256(f'tts-1|nova|1.0|{text}'.encode()).hexdigest()
+        audio_bytes = shared_cache.get('tts', tts_key) if cacheable else None
+        
+        if audio_bytes is None:
+            # Generar audio con TTS en streaming, abortando si el cliente se desconecta
+            audio = io.BytesIO()
+            with admission.slot('openai', deadline.expires_at):
+                with get_openai_client().audio.speech.with_streaming_response.create(
+                    model='tts-1',
+                    voice='nova',
+                    input=text,
+                    speed=1.0,
+                    timeout=deadline.timeout()
+                ) as response:
+                    for chunk in response.iter_bytes():
+                        deadline.check()
+                        audio.write(chunk)
+            audio_bytes = audio.getvalue()
+            if cacheable:
+                shared_cache.set('tts', tts_key, audio_bytes, TTS_CACHE_TTL, max_bytes=TTS_CACHE_MAX_BYTES)
+        
+        print(f'Audio generado, tamaño: {len(audio_bytes)} bytes')
         print('✓ Audio TTS enviado correctamente')
         
-        # Enviar el archivo y eliminarlo después
-        try:
-            return send_file(
-                temp_file.name,
-                mimetype='audio/mpeg',
-                as_attachment=False,
-                download_name='speech.mp3'
-            )
-        finally:
-            # Programar eliminación del archivo temporal
-            try:
-                os.unlink(temp_file.name)
-            except:
-                pass
+        return send_file(
+            io.BytesIO(audio_bytes),
+            mimetype='audio/mpeg',
+            as_attachment=False,
+            download_name='speech.mp3'
+        )
     
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
+        # Un timeout por plazo vencido o desconexión se responde como cancelación
+        g.deadline.check()
         print(f'Error en TTS: {e}')
         return jsonify({'error': 'Error al generar audio'}), 500
 
 if __name__ == '__main__':
     print(f'🎙️  Servidor Python corriendo en http://localhost:{PORT}')
     print('Presiona Ctrl+C para detener')
+    print('(Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py server:app)')
+    # Con el recargador activo, solo el proceso hijo sirve peticiones
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up(wait_for_port=PORT)
     app.run(host='0.0.0.0', port=PORT, debug=True)
@@ -0,0 +1,92 @@
+"""
+Caché compartida entre procesos sobre SQLite
+
+Todos los workers del servidor leen y escriben en el mismo fichero, así que una
+respuesta de geocodificación, clima, TTS o calendario obtenida por un worker la
+aprovechan los demás. Cada entrada tiene un tiempo de vida (TTL) en segundos.
+
+Los errores se escriben en stderr: en el servidor MCP, stdout es el canal JSON-RPC.
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+
+# Junto al código y no en el directorio de trabajo: el servidor MCP se lanza desde
+# el directorio del cliente y debe compartir la caché (y sus invalidaciones) con server.py
+CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache.sqlite3'))
+
+_local = threading.local()
+
+
+def _connection():
+    """Conexión SQLite por hilo y por proceso (no se comparte tras un fork)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value BLOB NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def get(namespace, key):
+    """Devuelve el valor guardado o None si no existe o ha caducado"""
+    try:
+        row = _connection().execute(
+            'SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (namespace, key, time.time())
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f'Error al leer la caché: {e}', file=sys.stderr)
+        return None
+    return pickle.loads(row[0]) if row else None
+
+
+def set(namespace, key, value, ttl, max_bytes=None):
+    """
+    Guarda un valor durante `ttl` segundos y purga las entradas caducadas
+
+    Args:
+        max_bytes: Tamaño máximo del espacio de nombres (opcional). Si se supera, se
+                   eliminan primero las entradas que antes iban a caducar.
+    """
+    now = time.time()
+    try:
+        conn = _connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+            (namespace, key, pickle.dumps(value), now + ttl)
+        )
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        if max_bytes is not None:
+            conn.execute(
+                'DELETE FROM cache WHERE rowid IN ('
+                ' SELECT rowid FROM ('
+                '  SELECT rowid, SUM(length(value)) OVER (ORDER BY expires_at DESC) AS total'
+                '  FROM cache WHERE namespace = ?)'
+                ' WHERE total > ?)',
+                (namespace, max_bytes)
+            )
+    except sqlite3.Error as e:
+        print(f'Error al escribir en la caché: {e}', file=sys.stderr)
+
+
+def invalidate(namespace):
+    """Elimina todas las entradas de un espacio de nombres"""
+    try:
+        _connection().execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+    except sqlite3.Error as e:
+        print(f'Error al invalidar la caché: {e}', file=sys.stderr)
@@ -0,0 +1,140 @@
+"""
+Servicio de archivos estáticos desde memoria
+
+Al arrancar se leen los archivos de `public/`, se calcula su huella (hash del
+contenido) y se precomprimen con gzip y brotli. Cada archivo se sirve también con
+una URL con huella (app.3f2a9c1b7d.js) que index.html referencia y que se cachea
+como inmutable; las URLs originales se revalidan con ETag y responden 304.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirve gzip
+    brotli = None
+
+# Cabeceras de caché para URLs con huella y para URLs originales
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Referencias a otros archivos dentro de los HTML (src="..." / href="...")
+_REFERENCE_RE = re.compile(r'\b(src|href)="(/?)([^"#?:]+)"')
+
+
+class _Asset:
+    """Un archivo estático con sus variantes codificadas"""
+
+    def __init__(self, content, mimetype):
+        self.mimetype = mimetype
+        digest = hashlib.sha256(content).hexdigest()
+        self.fingerprint = digest[:10]
+
+        # Variantes por codificación: (cuerpo, etag). Cada una tiene su propio ETag fuerte
+        self.variants = {'identity': (content, digest[:20])}
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.variants['gzip'] = (compressed, f'{digest[:20]}-gzip')
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants['br'] = (compressed, f'{digest[:20]}-br')
+
+
+class StaticAssets:
+    """Archivos de una carpeta servidos desde memoria con huella, precompresión y ETags"""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self._assets = {}
+        self._mtimes = {}
+        self.hashed_names = {}
+        self.reload()
+
+    def _scan(self):
+        """Rutas relativas (con '/') y fecha de modificación de los archivos de la carpeta"""
+        return {
+            path.relative_to(self.folder).as_posix(): path.stat().st_mtime
+            for path in self.folder.rglob('*') if path.is_file()
+        }
+
+    def reload(self):
+        """Vuelve a leer, calcular huellas y comprimir todos los archivos"""
+        mtimes = self._scan()
+        contents = {name: (self.folder / name).read_bytes() for name in mtimes}
+
+        # Huellas de los archivos referenciables (los HTML se sirven siempre por su nombre)
+        hashed_names = {}
+        for name, content in contents.items():
+            if not name.endswith('.html'):
+                stem, ext = os.path.splitext(name)
+                hashed_names[name] = f'{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}'
+
+        assets = {}
+        for name, content in contents.items():
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if name.endswith('.html'):
+                content = self._rewrite_references(name, content, hashed_names)
+            asset = _Asset(content, mimetype)
+            assets[name] = (asset, False)
+            if name in hashed_names:
+                assets[hashed_names[name]] = (asset, True)
+
+        self._assets = assets
+        self._mtimes = mtimes
+        self.hashed_names = hashed_names
+        print(f'✓ {len(contents)} archivos estáticos cargados en memoria')
+
+    def reload_if_changed(self):
+        """Recarga los archivos si alguno ha cambiado en disco (útil en desarrollo)"""
+        if self._scan() != self._mtimes:
+            self.reload()
+
+    def _rewrite_references(self, name, content, hashed_names):
+        """Sustituye en un HTML las referencias locales por sus URLs con huella"""
+        base = os.path.dirname(name)
+
+        def replace(match):
+            attribute, slash, target = match.groups()
+            resolved = target if slash else os.path.normpath(os.path.join(base, target)).replace(os.sep, '/')
+            if resolved not in hashed_names:
+                return match.group(0)
+            return f'{attribute}="/{hashed_names[resolved]}"'
+
+        return _REFERENCE_RE.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+    def serve(self, path):
+        """
+        Respuesta para la petición actual de un archivo estático
+
+        Returns:
+            Response de Flask (200 o 304), o None si el archivo no existe
+        """
+        entry = self._assets.get(path)
+        if entry is None:
+            return None
+        asset, hashed = entry
+
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        body, etag = asset.variants[encoding]
+
+        response = Response(body, mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if hashed else REVALIDATE_CACHE
+        response.set_etag(etag)
+        return response.make_conditional(request)
@@ -0,0 +1,69 @@
+"""
+Pruebas de busy_index.BusyIndex frente a una implementación por fuerza bruta
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busy_index import BusyIndex
+
+
+def brute_is_free(intervals, start, end):
+    return all(not (busy_start < end and start < busy_end) for busy_start, busy_end in intervals)
+
+
+def brute_next_free_slot(intervals, after, duration):
+    candidate = after
+    while not brute_is_free(intervals, candidate, candidate + duration):
+        candidate += 1
+    return candidate
+
+
+def random_intervals(rng):
+    intervals = []
+    for _ in range(rng.randint(0, 20)):
+        start = rng.randint(0, 100)
+        intervals.append((start, start + rng.randint(1, 12)))
+    return intervals
+
+
+def test_matches_brute_force():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        intervals = random_intervals(rng)
+        index = BusyIndex(intervals)
+        for _ in range(20):
+            start = rng.randint(-5, 130)
+            duration = rng.randint(1, 15)
+            assert index.is_free(start, start + duration) == brute_is_free(intervals, start, start + duration), \
+                (intervals, start, duration)
+            assert index.next_free_slot(start, duration) == brute_next_free_slot(intervals, start, duration), \
+                (intervals, start, duration)
+
+
+def test_merges_overlapping_and_touching_intervals():
+    index = BusyIndex([(5, 8), (0, 3), (3, 5), (10, 12), (11, 15)])
+    assert index.starts == [0, 10]
+    assert index.ends == [8, 15]
+    assert index.busy_at(4) == (0, 8)
+    assert index.busy_at(8) is None
+
+
+def test_empty_index():
+    index = BusyIndex([])
+    assert len(index) == 0
+    assert index.is_free(0, 100)
+    assert index.next_free_slot(7, 30) == 7
+
+
+def test_datetimes():
+    base = datetime(2025, 12, 6, 8, 0, tzinfo=timezone.utc)
+    hour = timedelta(hours=1)
+    index = BusyIndex([(base, base + hour), (base + 90 * timedelta(minutes=1), base + 3 * hour)])
+    assert not index.is_free(base + hour / 2, base + hour)
+    assert index.is_free(base + hour, base + 90 * timedelta(minutes=1))
+    assert index.next_free_slot(base, hour) == base + 3 * hour
+    assert index.next_free_slot(base, hour / 2) == base + hour